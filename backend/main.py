@@ -1,14 +1,20 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel
-import json
+from dataclasses import dataclass, asdict
+import functools
+import heapq
+import numpy as np
+import orjson
+import re
 from datetime import datetime, date, timedelta
 from typing import List, Optional
 import os
-import networkx as nx
 from zoneinfo import ZoneInfo
 
-app = FastAPI(title="SkyPath Flight Search API", version="1.0.0")
+app = FastAPI(title="SkyPath Flight Search API", version="1.0.0",
+              default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,14 +25,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-class Airport(BaseModel):
+# Internal models are plain slotted dataclasses: they are built in bulk at
+# load time and per search result, where pydantic validation cost adds up.
+# Only SearchRequest stays a BaseModel to validate client input.
+@dataclass(slots=True)
+class Airport:
     code: str
     name: str
     city: str
     country: str
     timezone: str
 
-class Flight(BaseModel):
+@dataclass(slots=True)
+class Flight:
     flightNumber: str
     airline: str
     origin: str
@@ -36,70 +47,180 @@ class Flight(BaseModel):
     price: float
     aircraft: str
 
-class FlightSegment(BaseModel):
-    flight: Flight
-    duration_minutes: int
-
-class Itinerary(BaseModel):
-    flights: List[FlightSegment]
-    total_duration_minutes: int
-    total_price: float
-    layovers: List[dict] = []
-
 class SearchRequest(BaseModel):
     origin: str
     destination: str
     date: str
 
+@dataclass(slots=True)
+class FlightRec:
+    """Flight plus values precomputed at load time for the search hot path"""
+    idx: int
+    flightNumber: str
+    airline: str
+    origin: str
+    destination: str
+    departureTime: str
+    arrivalTime: str
+    price: float
+    aircraft: str
+    departure_utc: datetime
+    arrival_utc: datetime
+    duration_minutes: int
+    date_local: str
+    arrival_date_local: str
+    arrival_next_date_local: str
+    origin_country: str
+    destination_country: str
+    is_domestic: bool
+
+UTC = ZoneInfo('UTC')
+
+# Upper bound on itineraries returned per search; also drives pruning
+# during connection expansion
+MAX_RESULTS = 50
+
+# 'connections' (default) searches with up to 2 stops; 'direct' limits
+# results to nonstop flights
+SEARCH_MODE = os.environ.get("SEARCH_MODE", "connections")
+
+_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
 airports = {}
+airports_payload = b""
+zoneinfo_cache = {}
 flights = []
-flight_graph = nx.DiGraph()
+flight_dicts = []
+flight_recs = []
+flights_by_od_date = {}
+flights_by_origin_date = {}
+
+# Structure-of-arrays views over flight_recs, used to filter connection
+# candidates with single vector ops instead of per-flight Python checks
+dep_epoch = np.empty(0, dtype=np.int64)
+arr_epoch = np.empty(0, dtype=np.int64)
+domestic_flags = np.empty(0, dtype=bool)
 
 def load_flight_data():
-    global airports, flights, flight_graph
-    
+    global airports, airports_payload, flights, flight_dicts
+
     flights_file = "/app/flights.json"
     if not os.path.exists(flights_file):
-        flights_file = "../flights.json" 
-    
-    with open(flights_file, 'r') as f:
-        data = json.load(f)
-        
+        flights_file = "../flights.json"
+
+    # orjson wants bytes; noticeably faster than stdlib json on large files
+    with open(flights_file, 'rb') as f:
+        data = orjson.loads(f.read())
+
     airports = {airport['code']: Airport(**airport) for airport in data['airports']}
+    # flights.json is trusted (shipped with the app) and static, so the
+    # /airports response can be serialized once here
+    airports_payload = orjson.dumps([asdict(airport) for airport in airports.values()])
+
+    # The dataset mixes int/str/float prices; pydantic used to coerce these
+    for flight in data['flights']:
+        flight['price'] = float(flight['price'])
     flights = [Flight(**flight) for flight in data['flights']]
-    build_flight_graph()
+    # Responses reuse these dicts by reference, so each flight is
+    # serialized from the same object no matter how often it appears
+    flight_dicts = [asdict(flight) for flight in flights]
+    for airport in airports.values():
+        zoneinfo_cache.setdefault(airport.timezone, ZoneInfo(airport.timezone))
+    build_flight_recs()
+    build_flight_indexes()
+    # Cached responses are derived from the data just replaced
+    _search_cached.cache_clear()
 
-def build_flight_graph():
-    """Build networkx graph of flights for connection search"""
-    global flight_graph
-    flight_graph = nx.DiGraph()
-    
-    # Add all airports as nodes
-    for airport_code in airports.keys():
-        flight_graph.add_node(airport_code)
-    
-    # Add flights as edges with flight data
-    for flight in flights:
-        flight_graph.add_edge(
-            flight.origin, 
-            flight.destination, 
-            flight_data=flight,
-            departure_time=flight.departureTime,
-            arrival_time=flight.arrivalTime
-        )
+def build_flight_recs():
+    """Precompute UTC times, durations and countries once per flight"""
+    global flight_recs
+    flight_recs = []
+
+    for idx, flight in enumerate(flights):
+        # Flights referencing unknown airports can never be searched or
+        # connect validly, so leave them out of the precomputed records
+        if flight.origin not in airports or flight.destination not in airports:
+            continue
+
+        flight_recs.append(FlightRec(
+            idx=idx,
+            flightNumber=flight.flightNumber,
+            airline=flight.airline,
+            origin=flight.origin,
+            destination=flight.destination,
+            departureTime=flight.departureTime,
+            arrivalTime=flight.arrivalTime,
+            price=flight.price,
+            aircraft=flight.aircraft,
+            departure_utc=to_utc_datetime(flight.departureTime, flight.origin),
+            arrival_utc=to_utc_datetime(flight.arrivalTime, flight.destination),
+            duration_minutes=calculate_duration(
+                flight.departureTime, flight.origin,
+                flight.arrivalTime, flight.destination
+            ),
+            date_local=flight.departureTime[:10],
+            arrival_date_local=flight.arrivalTime[:10],
+            arrival_next_date_local=(
+                date.fromisoformat(flight.arrivalTime[:10]) + timedelta(days=1)
+            ).isoformat(),
+            origin_country=airports[flight.origin].country,
+            destination_country=airports[flight.destination].country,
+            is_domestic=airports[flight.origin].country == airports[flight.destination].country,
+        ))
+
+def build_flight_indexes():
+    """Index flights by route and origin (and departure date) for O(1) lookup"""
+    global flights_by_od_date, flights_by_origin_date
+    global dep_epoch, arr_epoch, domestic_flags
+    flights_by_od_date = {}
+    by_origin_date = {}
+
+    for pos, rec in enumerate(flight_recs):
+        flights_by_od_date.setdefault((rec.origin, rec.destination, rec.date_local), []).append(rec)
+        # The origin index stores positions into flight_recs so candidate
+        # sets can be filtered through the epoch arrays below
+        by_origin_date.setdefault((rec.origin, rec.date_local), []).append(pos)
+
+    flights_by_origin_date = {
+        key: np.asarray(positions, dtype=np.int64)
+        for key, positions in by_origin_date.items()
+    }
+
+    count = len(flight_recs)
+    dep_epoch = np.fromiter(
+        (int(rec.departure_utc.timestamp()) for rec in flight_recs), np.int64, count)
+    arr_epoch = np.fromiter(
+        (int(rec.arrival_utc.timestamp()) for rec in flight_recs), np.int64, count)
+    domestic_flags = np.fromiter(
+        (rec.is_domestic for rec in flight_recs), bool, count)
+
+def _parse_flight_time(time_str: str) -> datetime:
+    """Parse the fixed YYYY-MM-DDTHH:MM:SS shape used by flights.json
+
+    Faster than the general datetime.fromisoformat because the format is
+    known; raises ValueError on malformed input just the same.
+    """
+    return datetime(
+        int(time_str[0:4]), int(time_str[5:7]), int(time_str[8:10]),
+        int(time_str[11:13]), int(time_str[14:16]), int(time_str[17:19])
+    )
+
+@functools.lru_cache(maxsize=100_000)
+def _to_utc_cached(local_time_str: str, tz_name: str) -> datetime:
+    """Convert a local time string in the given timezone to UTC (memoized)"""
+    timezone = zoneinfo_cache.get(tz_name) or ZoneInfo(tz_name)
+
+    local_dt = _parse_flight_time(local_time_str)
+    local_dt_with_tz = local_dt.replace(tzinfo=timezone)
+
+    return local_dt_with_tz.astimezone(UTC)
 
 def to_utc_datetime(local_time_str: str, airport_code: str) -> datetime:
     """Convert local airport time to UTC datetime"""
     if airport_code not in airports:
         raise ValueError(f"Unknown airport: {airport_code}")
-    
-    airport = airports[airport_code]
-    timezone = ZoneInfo(airport.timezone)
-    
-    local_dt = datetime.fromisoformat(local_time_str)
-    local_dt_with_tz = local_dt.replace(tzinfo=timezone)
-    
-    return local_dt_with_tz.astimezone(ZoneInfo('UTC'))
+
+    return _to_utc_cached(local_time_str, airports[airport_code].timezone)
 
 def calculate_duration(departure_time: str, departure_airport: str, 
                       arrival_time: str, arrival_airport: str) -> int:
@@ -114,96 +235,93 @@ def calculate_duration(departure_time: str, departure_airport: str,
     
     return duration_minutes
 
-def is_valid_connection(flight1: Flight, flight2: Flight) -> bool:
-    """Validate connection using UTC times with domestic/international rules"""
-    if flight1.destination != flight2.origin:
-        return False
-    
-    arr1_utc = to_utc_datetime(flight1.arrivalTime, flight1.destination)
-    dep2_utc = to_utc_datetime(flight2.departureTime, flight2.origin)
-    
-    layover_minutes = int((dep2_utc - arr1_utc).total_seconds() / 60)
-    
-    connection_airport = flight1.destination
-    if connection_airport not in airports:
-        return False
-        
-    origin1_country = airports[flight1.origin].country if flight1.origin in airports else None
-    origin2_country = airports[flight2.origin].country if flight2.origin in airports else None
-    dest1_country = airports[flight1.destination].country if flight1.destination in airports else None
-    dest2_country = airports[flight2.destination].country if flight2.destination in airports else None
-    
-    if not all([origin1_country, origin2_country, dest1_country, dest2_country]):
-        return False
-    
-    is_domestic = (origin1_country == dest1_country == origin2_country == dest2_country)
-    
-    min_layover = 45 if is_domestic else 90
-    max_layover = 360
-    
-    return min_layover <= layover_minutes <= max_layover
-
-def find_connection_paths(origin: str, destination: str, date: str, max_stops: int = 2) -> List[List[Flight]]:
-    """Find flight paths with connections using networkx"""
+def find_connection_paths(origin: str, destination: str, date: str, max_stops: int = 2) -> List[List[FlightRec]]:
+    """Find valid multi-flight sequences by expanding segment by segment"""
     valid_paths = []
-    
-    try:
-        paths = list(nx.all_simple_paths(flight_graph, origin, destination, cutoff=max_stops + 1))
-    except nx.NetworkXNoPath:
-        return []
-    
-    # For each path, find valid flight combinations
-    for path in paths:
-        if len(path) <= 2:  # Skip direct 
-            continue
-        if len(path) != len(set(path)):
+    # Max-heap (negated) of the best MAX_RESULTS completed scores, used to
+    # prune partial sequences that can no longer make the cut
+    best_scores = []
+
+    for first_pos in flights_by_origin_date.get((origin, date), ()):
+        first_flight = flight_recs[first_pos]
+        # Direct flights are handled by search_direct_flights
+        if first_flight.destination == destination:
             continue
-            
-        # Get all possible flight combinations for this path
-        path_flights = []
-        for i in range(len(path) - 1):
-            segment_flights = []
-            origin_seg = path[i]
-            dest_seg = path[i + 1]
-            
-            for flight in flights:
-                if (flight.origin == origin_seg and 
-                    flight.destination == dest_seg):
-                    # Only first flight must depart on requested date
-                    if i == 0 and not flight.departureTime.startswith(date):
-                        continue
-                    segment_flights.append(flight)
-            
-            path_flights.append(segment_flights)
-        
-        # Generate combinations and validate connections
-        if all(path_flights): 
-            valid_combinations = generate_flight_combinations(path_flights)
-            valid_paths.extend(valid_combinations)
-    
+        _expand_connections(
+            int(first_pos), destination,
+            {origin, first_flight.destination},
+            [first_flight], max_stops,
+            first_flight.duration_minutes, first_flight.price,
+            valid_paths, best_scores
+        )
+
     return valid_paths
 
-def generate_flight_combinations(path_flights: List[List[Flight]]) -> List[List[Flight]]:
-    """Generate valid flight combinations for a path"""
-    import itertools
-    
-    valid_combinations = []
-    
-    # Generate all combinations
-    for combination in itertools.product(*path_flights):
-        valid = True
-        for i in range(len(combination) - 1):
-            if not is_valid_connection(combination[i], combination[i + 1]):
-                valid = False
-                break
-        
-        if valid:
-            valid_combinations.append(list(combination))
-    
-    # Early pruning
-    return valid_combinations[:10]  # Max 10 combinations per path
+def _expand_connections(prev_pos: int, destination: str, visited: set,
+                        current_flights: List[FlightRec], remaining_hops: int,
+                        partial_duration: int, partial_price: float,
+                        out: List[List[FlightRec]], best_scores: List[float]):
+    """Extend a partial flight sequence, keeping only valid connections"""
+    prev_flight = flight_recs[prev_pos]
+    connection_airport = prev_flight.destination
+    prev_arr = arr_epoch[prev_pos]
+
+    # The layover window is at most 6h, so a connecting flight departs on
+    # the arrival's local date or the day after; only those index buckets
+    # can contain valid candidates
+    for day in (prev_flight.arrival_date_local, prev_flight.arrival_next_date_local):
+        candidates = flights_by_origin_date.get((connection_airport, day))
+        if candidates is None:
+            continue
+
+        # Layover rules in one vector op: 45min minimum when both legs are
+        # domestic (the shared connection airport makes the pair domestic),
+        # 90min otherwise, 6h maximum either way
+        wait = dep_epoch[candidates] - prev_arr
+        if prev_flight.is_domestic:
+            min_wait = np.where(domestic_flags[candidates], 45 * 60, 90 * 60)
+        else:
+            min_wait = 90 * 60
+
+        for next_pos in candidates[(wait >= min_wait) & (wait <= 360 * 60)]:
+            next_flight = flight_recs[next_pos]
+            layover = int(dep_epoch[next_pos] - prev_arr) // 60
+            duration = partial_duration + layover + next_flight.duration_minutes
+            price = partial_price + next_flight.price
+
+            # The score only grows as a sequence is extended, so once the
+            # top MAX_RESULTS is full anything already scoring worse is dead
+            score = _composite_score(len(current_flights), duration, price)
+            if len(best_scores) == MAX_RESULTS and score >= -best_scores[0]:
+                continue
 
-def search_with_connections(origin: str, destination: str, date: str) -> List[Itinerary]:
+            if next_flight.destination == destination:
+                out.append(current_flights + [next_flight])
+                if len(best_scores) == MAX_RESULTS:
+                    heapq.heappushpop(best_scores, -score)
+                else:
+                    heapq.heappush(best_scores, -score)
+            elif remaining_hops > 1 and next_flight.destination not in visited:
+                _expand_connections(
+                    int(next_pos), destination,
+                    visited | {next_flight.destination},
+                    current_flights + [next_flight],
+                    remaining_hops - 1, duration, price,
+                    out, best_scores
+                )
+
+@functools.lru_cache(maxsize=4096)
+def _search_cached(origin: str, destination: str, date: str, limit: int) -> bytes:
+    """Serialized search results; a pure function of the static flight data"""
+    if SEARCH_MODE == "direct":
+        results = search_direct_flights(origin, destination, date)
+    else:
+        results = search_with_connections(origin, destination, date)
+
+    # Results are already in score order, so the top-limit is a slice
+    return orjson.dumps(results[:limit])
+
+def search_with_connections(origin: str, destination: str, date: str) -> List[dict]:
     """Search including connections up to 2 stops"""
     results = []
     
@@ -216,96 +334,74 @@ def search_with_connections(origin: str, destination: str, date: str) -> List[It
         layovers = []
         total_price = sum(flight.price for flight in path_flights)
         total_duration = 0
-        
+
         segments = []
         for i, flight in enumerate(path_flights):
-            duration = calculate_duration(
-                flight.departureTime, flight.origin,
-                flight.arrivalTime, flight.destination
-            )
-            segments.append(FlightSegment(flight=flight, duration_minutes=duration))
+            duration = flight.duration_minutes
+            segments.append({"flight": flight_dicts[flight.idx], "duration_minutes": duration})
             total_duration += duration
-            
+
             if i < len(path_flights) - 1:
                 next_flight = path_flights[i + 1]
-                arr_utc = to_utc_datetime(flight.arrivalTime, flight.destination)
-                dep_utc = to_utc_datetime(next_flight.departureTime, next_flight.origin)
-                layover_min = int((dep_utc - arr_utc).total_seconds() / 60)
-                
+                layover_min = int((next_flight.departure_utc - flight.arrival_utc).total_seconds() / 60)
+
                 layovers.append({
                     "airport": flight.destination,
                     "duration_minutes": layover_min
                 })
                 total_duration += layover_min
         
-        itinerary = Itinerary(
-            flights=segments,
-            total_duration_minutes=total_duration,
-            total_price=total_price,
-            layovers=layovers
-        )
-        
-        results.append(itinerary)
-    
-    # Sort by composite score (stops + duration + price)
-    results.sort(key=calculate_itinerary_score)    
-    
-    return results
+        results.append({
+            "flights": segments,
+            "total_duration_minutes": total_duration,
+            "total_price": total_price,
+            "layovers": layovers
+        })
+    
+    # Keep the best MAX_RESULTS by composite score (stops + duration + price)
+    return heapq.nsmallest(MAX_RESULTS, results, key=calculate_itinerary_score)
 
-def calculate_itinerary_score(itinerary: Itinerary) -> float:
+def _composite_score(num_stops: int, total_duration_minutes: int, total_price: float) -> float:
     """
     Calculate composite score for sorting flights.
     Lower score = better option
     """
-    # Number of stops (0 for direct, 1 for 1-stop, etc.)
-    num_stops = len(itinerary.flights) - 1
-    
     # Penalty for each stop: 120 minutes equivalent 
     stops_penalty = num_stops * 120
     
     # Duration weight: normalize to minutes
-    duration_weight = itinerary.total_duration_minutes
+    duration_weight = total_duration_minutes
     
     # Price weight: normalize price (e.g., $100 = 60 minutes equivalent)
-    price_weight = itinerary.total_price * 0.6
+    price_weight = total_price * 0.6
     
     # Composite score (weighted sum)
     score = (stops_penalty * 0.25) + (duration_weight * 0.50) + (price_weight * 0.25)
     
     return score
 
-def search_direct_flights(origin: str, destination: str, date: str) -> List[Itinerary]:
+def calculate_itinerary_score(itinerary: dict) -> float:
+    """Composite score of a built itinerary (0 stops = direct)"""
+    return _composite_score(
+        len(itinerary["flights"]) - 1,
+        itinerary["total_duration_minutes"],
+        itinerary["total_price"]
+    )
+
+def search_direct_flights(origin: str, destination: str, date: str) -> List[dict]:
     """Search for direct flights only"""
     results = []
-    
-    for flight in flights:
-        if flight.origin != origin or flight.destination != destination:
-            continue
-            
-        flight_date = flight.departureTime[:10]
-        if flight_date != date:
-            continue
-            
-        duration = calculate_duration(
-            flight.departureTime, flight.origin,
-            flight.arrivalTime, flight.destination
-        )
-        
-        segment = FlightSegment(flight=flight, duration_minutes=duration)
-        
-        itinerary = Itinerary(
-            flights=[segment],
-            total_duration_minutes=duration,
-            total_price=flight.price,
-            layovers=[]
-        )
-        
-        results.append(itinerary)
-    
-    # Sort by composite score (stops + duration + price)
-    results.sort(key=calculate_itinerary_score)
-    
-    return results
+
+    for flight in flights_by_od_date.get((origin, destination, date), []):
+        results.append({
+            "flights": [{"flight": flight_dicts[flight.idx], "duration_minutes": flight.duration_minutes}],
+            "total_duration_minutes": flight.duration_minutes,
+            "total_price": flight.price,
+            "layovers": []
+        })
+    
+    # Keep the best MAX_RESULTS by composite score (stops + duration + price)
+    return heapq.nsmallest(MAX_RESULTS, results, key=calculate_itinerary_score)
 
 @app.on_event("startup")
 async def startup_event():
@@ -318,13 +414,15 @@ async def root():
     return {"message": "SkyPath Flight Search API", "status": "running"}
 
 @app.get("/airports")
-async def get_airports():
+def get_airports():
     """Get all airports"""
-    return list(airports.values())
+    return Response(content=airports_payload, media_type="application/json")
 
 @app.post("/search")
-async def search_flights(request: SearchRequest) -> List[Itinerary]:
-    """Search for flights"""
+def search_flights(request: SearchRequest, limit: int = MAX_RESULTS):
+    """Search for flights, returning at most `limit` itineraries"""
+
+    limit = max(1, min(limit, MAX_RESULTS))
     
     request.origin = request.origin.upper().strip()
     request.destination = request.destination.upper().strip()
@@ -344,22 +442,26 @@ async def search_flights(request: SearchRequest) -> List[Itinerary]:
     if request.origin == request.destination:
         raise HTTPException(status_code=400, detail="Origin and destination cannot be the same")
     
+    # Cheap shape check first so well-formed requests skip exception
+    # handling entirely; fromisoformat still rejects impossible dates
+    if not _DATE_RE.match(request.date):
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
     try:
-        search_date = datetime.fromisoformat(request.date)
-        today = date.today()
-        min_date = date(2024, 1, 1)
-        max_date = today + timedelta(days=365)
-        
-        if search_date.date() < min_date:
-            raise HTTPException(status_code=400, detail="Search date cannot be before 2024")
-            
+        search_date = date.fromisoformat(request.date)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+    if search_date < date(2024, 1, 1):
+        raise HTTPException(status_code=400, detail="Search date cannot be before 2024")
     
-    results = search_with_connections(request.origin, request.destination, request.date)
-    
-    return results
+    # Repeat searches for the same route and date reuse the cached bytes
+    content = _search_cached(request.origin, request.destination, request.date, limit)
+
+    return Response(content=content, media_type="application/json")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # The import-string form is required for workers to take effect
+    uvicorn.run("main:app", host="0.0.0.0", port=8000,
+                workers=os.cpu_count(), loop="uvloop", http="httptools")